@@ -33,13 +33,7 @@ def get_theme():
 
 T = get_theme()
 
-CITY_COORDS = {
-    'Chennai':(13.0827,80.2707),'Mumbai':(19.0760,72.8777),'Delhi':(28.6139,77.2090),
-    'Bangalore':(12.9716,77.5946),'Hyderabad':(17.3850,78.4867),'Kolkata':(22.5726,88.3639),
-    'Pune':(18.5204,73.8567),'Ahmedabad':(23.0225,72.5714),'Coimbatore':(11.0168,76.9558),
-    'Madurai':(9.9252,78.1198),'Jaipur':(26.9124,75.7873),'Surat':(21.1702,72.8311),
-    'Lucknow':(26.8467,80.9462),'Nagpur':(21.1458,79.0882),'Visakhapatnam':(17.6868,83.2185),
-}
+from stop_registry import HUBS
 
 st.markdown(f"""
 <style>
@@ -215,7 +209,7 @@ with map_col:
     tile = 'CartoDB dark_matter' if st.session_state.dark_mode else 'CartoDB positron'
     m = folium.Map(location=[20.5937, 78.9629], zoom_start=5, tiles=tile)
 
-    for city, (lat, lon) in CITY_COORDS.items():
+    for city, lat, lon in zip(HUBS.names, HUBS.lat, HUBS.lon):
         risk = np.random.choice(['high','medium','low'], p=[0.15,0.35,0.5])
         color = {'high':'red','medium':'orange','low':'green'}[risk]
         count = np.random.randint(20, 200)
@@ -225,7 +219,7 @@ with map_col:
         ).add_to(m)
 
     route = ['Chennai','Bangalore','Hyderabad','Pune','Mumbai']
-    coords = [CITY_COORDS[c] for c in route]
+    coords = HUBS.coords(HUBS.indices(route)).tolist()
     folium.PolyLine(coords, color='#4f46e5', weight=3, opacity=0.8, tooltip="Optimized Route").add_to(m)
     folium_static(m, height=380)
 
@@ -1,7 +1,6 @@
 import streamlit as st
 import folium
 from streamlit_folium import folium_static
-import numpy as np
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -23,36 +22,78 @@ def get_theme():
 T = get_theme()
 lang = st.session_state.lang
 
-CITY_COORDS = {
-    'Chennai':(13.0827,80.2707),'Mumbai':(19.0760,72.8777),'Delhi':(28.6139,77.2090),
-    'Bangalore':(12.9716,77.5946),'Hyderabad':(17.3850,78.4867),'Kolkata':(22.5726,88.3639),
-    'Pune':(18.5204,73.8567),'Ahmedabad':(23.0225,72.5714),'Coimbatore':(11.0168,76.9558),
-    'Madurai':(9.9252,78.1198),'Jaipur':(26.9124,75.7873),'Surat':(21.1702,72.8311),
-    'Lucknow':(26.8467,80.9462),'Nagpur':(21.1458,79.0882),'Visakhapatnam':(17.6868,83.2185),
-}
-
-def haversine(c1, c2):
-    R = 6371
-    lat1,lon1 = np.radians(c1); lat2,lon2 = np.radians(c2)
-    dlat=lat2-lat1; dlon=lon2-lon1
-    a = np.sin(dlat/2)**2 + np.cos(lat1)*np.cos(lat2)*np.sin(dlon/2)**2
-    return R * 2 * np.arcsin(np.sqrt(a))
-
-def optimize(cities, start):
-    unvisited = cities.copy()
-    if start in unvisited: unvisited.remove(start)
-    route = [start]; total = 0; current = start
-    while unvisited:
-        nearest = min(unvisited, key=lambda c: haversine(CITY_COORDS[current], CITY_COORDS[c]))
-        total += haversine(CITY_COORDS[current], CITY_COORDS[nearest])
-        route.append(nearest); unvisited.remove(nearest); current = nearest
-    return route, round(total, 1)
+from route_optimizer import solve_anytime, original_route_distance, ROUTE_CACHE
+from stop_registry import HUBS
 
 def original_dist(cities):
-    total = 0
-    for i in range(len(cities)-1):
-        total += haversine(CITY_COORDS[cities[i]], CITY_COORDS[cities[i+1]])
-    return round(total, 1)
+    return round(original_route_distance(cities), 1)
+
+def route_summary(cities, opt_route, opt_dist, orig_dist):
+    opt_dist = round(opt_dist, 1)
+    savings_km = round(orig_dist - opt_dist, 1)
+    savings_pct = round(savings_km / orig_dist * 100, 1) if orig_dist > 0 else 0
+    fuel_saved = round(savings_km * 0.12, 1)
+    return {
+        'orig': cities, 'opt': opt_route,
+        'orig_dist': orig_dist, 'opt_dist': opt_dist,
+        'savings_km': savings_km, 'savings_pct': savings_pct,
+        'fuel_saved': fuel_saved, 'cost_saved': round(fuel_saved * 101, 0),
+        'petrol_money': round(savings_km * 12.12, 0)
+    }
+
+def draw_map(slot, r):
+    tile = 'CartoDB dark_matter' if st.session_state.dark_mode else 'CartoDB positron'
+    m = folium.Map(location=[18, 78], zoom_start=5, tiles=tile)
+    if r is not None:
+        orig_coords = HUBS.coords(HUBS.indices(r['orig'])).tolist()
+        opt_coords = HUBS.coords(HUBS.indices(r['opt'])).tolist()
+        folium.PolyLine(orig_coords, color='#ef4444', weight=2.5, opacity=0.5,
+                        dash_array='8', tooltip="Original Route").add_to(m)
+        folium.PolyLine(opt_coords, color='#4f46e5', weight=3.5, opacity=0.9,
+                        tooltip="Optimized Route").add_to(m)
+        for i, (city, (lat, lon)) in enumerate(zip(r['opt'], opt_coords)):
+            color = 'green' if i == 0 else 'blue' if i == len(r['opt'])-1 else 'lightblue'
+            folium.Marker([lat, lon], tooltip=f"Stop {i+1}: {city}",
+                icon=folium.Icon(color=color, icon='circle', prefix='fa')).add_to(m)
+    else:
+        for city, lat, lon in zip(HUBS.names, HUBS.lat, HUBS.lon):
+            folium.CircleMarker([lat, lon], radius=6, color='#4f46e5',
+                fill=True, fill_opacity=0.6, tooltip=city).add_to(m)
+    with slot.container():
+        folium_static(m, height=520)
+
+def draw_savings(slot, r):
+    with slot.container():
+        st.markdown(f"""
+        <div class="big-saving">
+            <div style="font-size:2rem;font-weight:800;color:#10b981;">₹{r['cost_saved']:,.0f}</div>
+            <div style="font-size:0.85rem;color:{T['subtext']};margin-top:4px;">{"இந்த பயணத்தில் சேமிப்பு" if lang=="TA" else "Total savings on this trip"}</div>
+        </div>
+        <div class="card">
+            <div class="savings-row">
+                <span class="savings-label">{"அசல் தூரம்" if lang=="TA" else "Original Distance"}</span>
+                <span class="savings-value">{r['orig_dist']} km</span>
+            </div>
+            <div class="savings-row">
+                <span class="savings-label">{"தேர்வு செய்யப்பட்ட தூரம்" if lang=="TA" else "Optimized Distance"}</span>
+                <span class="savings-value green">{r['opt_dist']} km</span>
+            </div>
+            <div class="savings-row">
+                <span class="savings-label">{"தூர சேமிப்பு" if lang=="TA" else "Distance Saved"}</span>
+                <span class="savings-value green">{r['savings_km']} km ({r['savings_pct']}%)</span>
+            </div>
+            <div class="savings-row">
+                <span class="savings-label">{"எரிபொருள் சேமிப்பு" if lang=="TA" else "Fuel Saved"}</span>
+                <span class="savings-value green">{r['fuel_saved']} Litres</span>
+            </div>
+            <div class="savings-row">
+                <span class="savings-label">{"பெட்ரோல் செலவு சேமிப்பு" if lang=="TA" else "Petrol Cost Saved"}</span>
+                <span class="savings-value green">₹{r['petrol_money']:,.0f}</span>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+        st.markdown(f"**{'அசல் பாதை' if lang=='TA' else 'Original Route'}:** " + " → ".join(r['orig']))
+        st.markdown(f"**{'தேர்வு பாதை' if lang=='TA' else 'Optimized Route'}:** " + " → ".join(r['opt']))
 
 st.markdown(f"""
 <style>
@@ -102,9 +143,13 @@ st.markdown(f'<div class="page-title">🗺️ {title}</div><div class="page-sub"
 
 left, right = st.columns([1, 1.6])
 
+with right:
+    st.markdown(f'<div style="font-size:1rem;font-weight:700;color:{T["text"]};margin-bottom:12px;">🗺️ {"பாதை வரைபடம்" if lang=="TA" else "Route Map"}</div>', unsafe_allow_html=True)
+    map_slot = st.empty()
+
 with left:
     st.markdown(f'<div class="card">', unsafe_allow_html=True)
-    all_cities = list(CITY_COORDS.keys())
+    all_cities = HUBS.names
     start = st.selectbox("🏭 " + ("தொடக்க நகரம்" if lang=="TA" else "Starting Warehouse"), all_cities)
     stops = st.multiselect(
         "📍 " + ("டெலிவரி நிறுத்தங்கள்" if lang=="TA" else "Delivery Stops"),
@@ -113,82 +158,26 @@ with left:
     )
     optimize_btn = st.button("🚀 " + ("பாதையை தேர்வு செய்" if lang=="TA" else "Optimize Route"), use_container_width=True, type="primary")
     st.markdown('</div>', unsafe_allow_html=True)
+    cache = ROUTE_CACHE.stats()
+    st.caption(f"🗄️ Route cache: {cache['hits'] + cache['disk_hits']} hits / {cache['misses']} misses ({cache['size']}/{cache['maxsize']} stored)")
 
+    status = st.empty()
+    savings_slot = st.empty()
     if optimize_btn and len(stops) >= 2:
         cities = [start] + stops
-        opt_route, opt_dist = optimize(cities, start)
         orig_dist = original_dist(cities)
-        savings_km = round(orig_dist - opt_dist, 1)
-        savings_pct = round(savings_km / orig_dist * 100, 1) if orig_dist > 0 else 0
-        fuel_saved = round(savings_km * 0.12, 1)
-        cost_saved = round(fuel_saved * 101, 0)
-        petrol_money = round(savings_km * 12.12, 0)
-
-        st.session_state['route_data'] = {
-            'orig': cities, 'opt': opt_route,
-            'orig_dist': orig_dist, 'opt_dist': opt_dist,
-            'savings_km': savings_km, 'savings_pct': savings_pct,
-            'fuel_saved': fuel_saved, 'cost_saved': cost_saved,
-            'petrol_money': petrol_money
-        }
+        # Show the greedy route right away and redraw as the solver refines it
+        for step in solve_anytime(cities, start, time_limit=3.0, memo=ROUTE_CACHE):
+            st.session_state['route_data'] = route_summary(cities, step['route'],
+                                                           step['distance_km'], orig_dist)
+            status.caption(f"⏳ {step['stage']}: {step['distance_km']:,.1f} km after {step['elapsed_s']:.2f}s")
+            draw_savings(savings_slot, st.session_state['route_data'])
+            draw_map(map_slot, st.session_state['route_data'])
+        status.empty()
 
     if 'route_data' in st.session_state:
-        r = st.session_state['route_data']
-        st.markdown(f"""
-        <div class="big-saving">
-            <div style="font-size:2rem;font-weight:800;color:#10b981;">₹{r['cost_saved']:,.0f}</div>
-            <div style="font-size:0.85rem;color:{T['subtext']};margin-top:4px;">{"இந்த பயணத்தில் சேமிப்பு" if lang=="TA" else "Total savings on this trip"}</div>
-        </div>
-        <div class="card">
-            <div class="savings-row">
-                <span class="savings-label">{"அசல் தூரம்" if lang=="TA" else "Original Distance"}</span>
-                <span class="savings-value">{r['orig_dist']} km</span>
-            </div>
-            <div class="savings-row">
-                <span class="savings-label">{"தேர்வு செய்யப்பட்ட தூரம்" if lang=="TA" else "Optimized Distance"}</span>
-                <span class="savings-value green">{r['opt_dist']} km</span>
-            </div>
-            <div class="savings-row">
-                <span class="savings-label">{"தூர சேமிப்பு" if lang=="TA" else "Distance Saved"}</span>
-                <span class="savings-value green">{r['savings_km']} km ({r['savings_pct']}%)</span>
-            </div>
-            <div class="savings-row">
-                <span class="savings-label">{"எரிபொருள் சேமிப்பு" if lang=="TA" else "Fuel Saved"}</span>
-                <span class="savings-value green">{r['fuel_saved']} Litres</span>
-            </div>
-            <div class="savings-row">
-                <span class="savings-label">{"பெட்ரோல் செலவு சேமிப்பு" if lang=="TA" else "Petrol Cost Saved"}</span>
-                <span class="savings-value green">₹{r['petrol_money']:,.0f}</span>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-
-        st.markdown(f"**{'அசல் பாதை' if lang=='TA' else 'Original Route'}:** " + " → ".join(r['orig']))
-        st.markdown(f"**{'தேர்வு பாதை' if lang=='TA' else 'Optimized Route'}:** " + " → ".join(r['opt']))
+        draw_savings(savings_slot, st.session_state['route_data'])
     elif optimize_btn:
         st.warning("Please select at least 2 delivery stops.")
 
-with right:
-    st.markdown(f'<div style="font-size:1rem;font-weight:700;color:{T["text"]};margin-bottom:12px;">🗺️ {"பாதை வரைபடம்" if lang=="TA" else "Route Map"}</div>', unsafe_allow_html=True)
-    tile = 'CartoDB dark_matter' if st.session_state.dark_mode else 'CartoDB positron'
-    m = folium.Map(location=[18, 78], zoom_start=5, tiles=tile)
-
-    if 'route_data' in st.session_state:
-        r = st.session_state['route_data']
-        orig_coords = [CITY_COORDS[c] for c in r['orig']]
-        opt_coords = [CITY_COORDS[c] for c in r['opt']]
-        folium.PolyLine(orig_coords, color='#ef4444', weight=2.5, opacity=0.5,
-                        dash_array='8', tooltip="Original Route").add_to(m)
-        folium.PolyLine(opt_coords, color='#4f46e5', weight=3.5, opacity=0.9,
-                        tooltip="Optimized Route").add_to(m)
-        for i, city in enumerate(r['opt']):
-            lat, lon = CITY_COORDS[city]
-            color = 'green' if i == 0 else 'blue' if i == len(r['opt'])-1 else 'lightblue'
-            folium.Marker([lat, lon], tooltip=f"Stop {i+1}: {city}",
-                icon=folium.Icon(color=color, icon='circle', prefix='fa')).add_to(m)
-    else:
-        for city, (lat, lon) in CITY_COORDS.items():
-            folium.CircleMarker([lat, lon], radius=6, color='#4f46e5',
-                fill=True, fill_opacity=0.6, tooltip=city).add_to(m)
-
-    folium_static(m, height=520)
+draw_map(map_slot, st.session_state.get('route_data'))
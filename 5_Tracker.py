@@ -4,6 +4,9 @@ from streamlit_folium import folium_static
 import numpy as np
 import time
 from datetime import datetime
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stop_registry import HUBS
 
 st.set_page_config(page_title="Live Tracker — RouteIQ", page_icon="📍", layout="wide")
 if 'logged_in' not in st.session_state or not st.session_state.logged_in:
@@ -22,13 +25,13 @@ def get_theme():
 T = get_theme()
 lang = st.session_state.lang
 
-# Simulate live delivery positions along routes
+# Simulate live delivery positions along routes (endpoints are hub registry indices)
 ROUTES = {
-    "DEL-2841": {"from": (13.0827,80.2707), "to": (19.0760,72.8777), "driver": "Ravi Kumar", "status": "In Transit"},
-    "DEL-2840": {"from": (28.6139,77.2090), "to": (12.9716,77.5946), "driver": "Suresh M", "status": "Delayed"},
-    "DEL-2839": {"from": (18.5204,73.8567), "to": (17.3850,78.4867), "driver": "Priya S", "status": "In Transit"},
-    "DEL-2838": {"from": (22.5726,88.3639), "to": (13.0827,80.2707), "driver": "Karthik R", "status": "On Time"},
-    "DEL-2837": {"from": (19.0760,72.8777), "to": (23.0225,72.5714), "driver": "Anbu T", "status": "In Transit"},
+    "DEL-2841": {"from": HUBS.index_of("Chennai"), "to": HUBS.index_of("Mumbai"), "driver": "Ravi Kumar", "status": "In Transit"},
+    "DEL-2840": {"from": HUBS.index_of("Delhi"), "to": HUBS.index_of("Bangalore"), "driver": "Suresh M", "status": "Delayed"},
+    "DEL-2839": {"from": HUBS.index_of("Pune"), "to": HUBS.index_of("Hyderabad"), "driver": "Priya S", "status": "In Transit"},
+    "DEL-2838": {"from": HUBS.index_of("Kolkata"), "to": HUBS.index_of("Chennai"), "driver": "Karthik R", "status": "On Time"},
+    "DEL-2837": {"from": HUBS.index_of("Mumbai"), "to": HUBS.index_of("Ahmedabad"), "driver": "Anbu T", "status": "In Transit"},
 }
 
 def get_current_position(from_coord, to_coord, progress):
@@ -143,17 +146,18 @@ with right:
 
     for did, info in ROUTES.items():
         prog = progress_values[did]
-        curr_pos = get_current_position(info['from'], info['to'], prog)
+        origin, dest = HUBS.coord(info['from']), HUBS.coord(info['to'])
+        curr_pos = get_current_position(origin, dest, prog)
         color = colors_map.get(info['status'], 'blue')
 
         # Route line
-        folium.PolyLine([info['from'], info['to']], color='#4f46e540', weight=2, opacity=0.5).add_to(m)
+        folium.PolyLine([origin, dest], color='#4f46e540', weight=2, opacity=0.5).add_to(m)
 
         # Origin marker
-        folium.CircleMarker(info['from'], radius=5, color='#4f46e5', fill=True,
+        folium.CircleMarker(origin, radius=5, color='#4f46e5', fill=True,
                             fill_opacity=0.7, tooltip="Origin").add_to(m)
         # Destination marker
-        folium.CircleMarker(info['to'], radius=5, color='#10b981', fill=True,
+        folium.CircleMarker(dest, radius=5, color='#10b981', fill=True,
                             fill_opacity=0.7, tooltip="Destination").add_to(m)
 
         # Live truck position
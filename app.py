@@ -12,9 +12,10 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
 
-from route_optimizer import optimize_and_compare, get_route_coordinates, CITY_COORDS
+from route_optimizer import optimize_cached, ROUTE_CACHE
+from stop_registry import HUBS
 from demand_forecast import forecast_demand, get_all_zones_summary, generate_historical_data
-from delay_model import predict_delay, train_model, generate_sample_data
+from delay_model import predict_delay, predict_delay_batch, train_model, generate_sample_data
 
 # ── Page Config ────────────────────────────────────────────────────────────────
 st.set_page_config(
@@ -150,8 +151,7 @@ if page == "📊 Dashboard Overview":
         st.markdown('<div class="section-header">🗺️ Live Delivery Network</div>', unsafe_allow_html=True)
         m = folium.Map(location=[20.5937, 78.9629], zoom_start=5,
                        tiles='CartoDB dark_matter')
-        cities_list = list(CITY_COORDS.keys())
-        for city, (lat, lon) in CITY_COORDS.items():
+        for city, lat, lon in zip(HUBS.names, HUBS.lat, HUBS.lon):
             risk = np.random.choice(['high', 'medium', 'low'], p=[0.15, 0.35, 0.5])
             color = {'high': 'red', 'medium': 'orange', 'low': 'green'}[risk]
             count = np.random.randint(20, 200)
@@ -161,7 +161,7 @@ if page == "📊 Dashboard Overview":
             ).add_to(m)
         # Draw sample route
         route_cities = ['Chennai', 'Bangalore', 'Hyderabad', 'Pune', 'Mumbai']
-        route_coords = [CITY_COORDS[c] for c in route_cities]
+        route_coords = HUBS.coords(HUBS.indices(route_cities)).tolist()
         folium.PolyLine(route_coords, color='#00d4ff', weight=2.5, opacity=0.7,
                         tooltip="Sample Optimized Route").add_to(m)
         folium_static(m, height=400)
@@ -217,7 +217,7 @@ elif page == "🗺️ Route Optimizer":
     st.markdown("# 🗺️ Delivery Route Optimizer")
     st.markdown("Select your delivery stops and RouteIQ will find the most efficient route.")
 
-    all_cities = list(CITY_COORDS.keys())
+    all_cities = HUBS.names
 
     col1, col2 = st.columns([1, 1.5])
 
@@ -235,8 +235,10 @@ elif page == "🗺️ Route Optimizer":
                 st.warning("Please select at least 2 delivery stops.")
             else:
                 cities_to_optimize = [start_city] + selected_cities
-                result = optimize_and_compare(cities_to_optimize, start=start_city)
+                result = optimize_cached(cities_to_optimize, start=start_city, improve="2opt")
                 st.session_state['route_result'] = result
+        cache = ROUTE_CACHE.stats()
+        st.caption(f"🗄️ Route cache: {cache['hits'] + cache['disk_hits']} hits / {cache['misses']} misses ({cache['size']}/{cache['maxsize']} stored)")
 
     if 'route_result' in st.session_state:
         result = st.session_state['route_result']
@@ -264,18 +266,17 @@ elif page == "🗺️ Route Optimizer":
             m2 = folium.Map(location=[18, 78], zoom_start=5, tiles='CartoDB dark_matter')
 
             # Original route (red dashed)
-            orig_coords = get_route_coordinates(result['original_route'])
+            orig_coords = HUBS.coords(HUBS.indices(result['original_route'])).tolist()
             folium.PolyLine(orig_coords, color='#ff4d4d', weight=2,
                             opacity=0.5, dash_array='8', tooltip="Original Route").add_to(m2)
 
             # Optimized route (cyan)
-            opt_coords = get_route_coordinates(result['optimized_route'])
+            opt_coords = HUBS.coords(HUBS.indices(result['optimized_route'])).tolist()
             folium.PolyLine(opt_coords, color='#00d4ff', weight=3.5,
                             opacity=0.9, tooltip="Optimized Route").add_to(m2)
 
             # Markers
-            for i, city in enumerate(result['optimized_route']):
-                lat, lon = CITY_COORDS[city]
+            for i, (city, (lat, lon)) in enumerate(zip(result['optimized_route'], opt_coords)):
                 color = 'green' if i == 0 else 'blue'
                 icon = 'home' if i == 0 else 'truck'
                 folium.Marker([lat, lon],
@@ -294,7 +295,7 @@ elif page == "⚠️ Delay Predictor":
     st.markdown("# ⚠️ Delivery Delay Predictor")
     st.markdown("Enter shipment details and the AI will predict delay risk in real time.")
 
-    all_cities = list(CITY_COORDS.keys())
+    all_cities = HUBS.names
 
     col1, col2 = st.columns(2)
     with col1:
@@ -371,13 +372,15 @@ elif page == "⚠️ Delay Predictor":
     # Bulk Risk Table
     st.markdown('<div class="section-header">📋 Bulk Shipment Risk Overview (Sample)</div>', unsafe_allow_html=True)
     sample_df = generate_sample_data(200)
-    sample_df['Risk'] = sample_df['is_late'].map({1: '🔴 High', 0: '🟢 Low'})
-    display_cols = ['distance_km', 'weight_g', 'freight_value', 'item_count', 'Risk']
+    scores = predict_delay_batch(sample_df)
+    sample_df['Delay Risk'] = (scores['delay_prob'] * 100).round(1)
+    sample_df['Risk'] = scores['risk'].astype(str)
+    display_cols = ['distance_km', 'weight_g', 'freight_value', 'item_count', 'Delay Risk', 'Risk']
     st.dataframe(
         sample_df[display_cols].rename(columns={
             'distance_km':'Distance (km)', 'weight_g':'Weight (g)',
-            'freight_value':'Freight (₹)', 'item_count':'Items'
-        }).head(15),
+            'freight_value':'Freight (₹)', 'item_count':'Items', 'Delay Risk':'Delay Risk (%)'
+        }).sort_values('Delay Risk (%)', ascending=False).head(15),
         use_container_width=True
     )
 
@@ -391,7 +394,7 @@ elif page == "📈 Demand Forecasting":
 
     col1, col2 = st.columns([1, 2])
     with col1:
-        zone = st.selectbox("🌆 Select Zone / City", list(CITY_COORDS.keys()), index=0)
+        zone = st.selectbox("🌆 Select Zone / City", HUBS.names, index=0)
         forecast_days = st.slider("📅 Forecast Days", 3, 14, 7)
 
     df_forecast, df_hist = forecast_demand(zone, forecast_days)
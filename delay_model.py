@@ -5,12 +5,19 @@ Uses Random Forest / XGBoost to predict delivery delays
 
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.ensemble import (RandomForestClassifier, GradientBoostingClassifier,
+                              HistGradientBoostingClassifier)
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score
 from sklearn.preprocessing import LabelEncoder
 import joblib
 import os
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from route_optimizer import DistanceMatrix
 
 def generate_sample_data(n=2000):
     """Generate realistic sample logistics data if no dataset is available."""
@@ -42,65 +49,463 @@ def generate_sample_data(n=2000):
     return df
 
 
-def train_model(df=None):
-    """Train the delay prediction model."""
-    if df is None:
-        print("📦 No dataset found. Generating sample data...")
-        df = generate_sample_data()
+# Training backends: 'gbm' is the original exact-split GradientBoostingClassifier
+# (single-threaded); 'hist' bins features into histograms, treats the two city
+# columns as native categoricals and trains on all cores.
+BACKENDS = ('gbm', 'hist')
+# Histogram boosting allows at most this many categories per feature
+MAX_CITY_CATEGORIES = 255
+
+
+def _make_model(backend, features):
+    if backend == 'gbm':
+        return GradientBoostingClassifier(n_estimators=150, learning_rate=0.1,
+                                          max_depth=4, random_state=42)
+    if backend == 'hist':
+        return HistGradientBoostingClassifier(
+            max_iter=150, learning_rate=0.1, max_leaf_nodes=31, early_stopping=False,
+            categorical_features=[f for f in features if f.endswith('_city_enc')],
+            random_state=42)
+    raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+
+
+def _training_frame(df, backend):
+    """Encode cities in place and return (X, y, encoder, features)."""
+    sellers = df['seller_city'].fillna('Unknown')
+    customers = df['customer_city'].fillna('Unknown')
+    if backend == 'hist':
+        # Keep the busiest cities as their own category and pool the long tail
+        counts = pd.concat([sellers, customers]).value_counts()
+        if len(counts) > MAX_CITY_CATEGORIES:
+            keep = counts.index[:MAX_CITY_CATEGORIES - 1]
+            sellers = sellers.where(sellers.isin(keep), 'Unknown')
+            customers = customers.where(customers.isin(keep), 'Unknown')
 
     le = LabelEncoder()
-    df['seller_city_enc'] = le.fit_transform(df['seller_city'].fillna('Unknown'))
-    df['customer_city_enc'] = le.transform(df['customer_city'].fillna('Unknown'))
+    le.fit(pd.concat([sellers, customers]))
+    df['seller_city_enc'] = le.transform(sellers)
+    df['customer_city_enc'] = le.transform(customers)
 
     features = ['distance_km', 'weight_g', 'order_dow', 'order_month',
                 'freight_value', 'item_count', 'seller_city_enc', 'customer_city_enc']
+    return df[features].fillna(0), df['is_late'], le, features
 
-    X = df[features].fillna(0)
-    y = df['is_late']
+
+# Model, city encoder and feature list saved together by train_model
+ARTIFACTS_FILE = 'delay_artifacts.pkl'
+
+
+def train_model(df=None, backend='gbm', directory='.'):
+    """
+    Train the delay prediction model with the given backend (see BACKENDS) and
+    save it as ARTIFACTS_FILE in `directory`.
+    """
+    if df is None:
+        print("📦 No dataset found. Generating sample data...")
+        df = generate_sample_data()
+
+    X, y, le, features = _training_frame(df, backend)
 
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42, stratify=y)
 
-    model = GradientBoostingClassifier(n_estimators=150, learning_rate=0.1,
-                                        max_depth=4, random_state=42)
+    model = _make_model(backend, features)
     model.fit(X_train, y_train)
 
     y_pred = model.predict(X_test)
     acc = accuracy_score(y_test, y_pred)
-    print(f"\n✅ Model Accuracy: {acc:.2%}")
+    print(f"\n✅ Model Accuracy ({backend}): {acc:.2%}")
     print(classification_report(y_test, y_pred, target_names=['On-Time', 'Delayed']))
 
-    joblib.dump(model, 'delay_model.pkl')
-    joblib.dump(le, 'city_encoder.pkl')
-    joblib.dump(features, 'features.pkl')
-    print("💾 Model saved as delay_model.pkl")
+    # One file, written then renamed, so a ModelRegistry never sees a model
+    # from one run next to the encoder from another
+    path = os.path.join(directory, ARTIFACTS_FILE)
+    joblib.dump({'model': model, 'encoder': le, 'features': features}, path + '.tmp')
+    os.replace(path + '.tmp', path)
+    print(f"💾 Model saved as {path}")
     return model, acc
 
 
+def benchmark_backends(sizes=(10_000, 100_000), backends=BACKENDS, predict_rows=100_000):
+    """
+    Train every backend on generate_sample_data(n) for each n in `sizes` and
+    time fitting, bulk scoring of `predict_rows` rows and single-row scoring.
+    Nothing is written to disk. Returns one row per (rows, backend).
+    """
+    results = []
+    for n in sizes:
+        df = generate_sample_data(n)
+        for backend in backends:
+            X, y, _, features = _training_frame(df, backend)
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=0.2, random_state=42, stratify=y)
+            model = _make_model(backend, features)
+
+            started = time.perf_counter()
+            model.fit(X_train, y_train)
+            train_s = time.perf_counter() - started
+
+            bulk = X_test.sample(predict_rows, replace=True, random_state=0)
+            started = time.perf_counter()
+            model.predict_proba(bulk)
+            bulk_s = time.perf_counter() - started
+
+            row = X_test.iloc[:1]
+            started = time.perf_counter()
+            for _ in range(100):
+                model.predict_proba(row)
+            single_ms = (time.perf_counter() - started) * 10
+
+            results.append({
+                'rows': n, 'backend': backend, 'train_s': round(train_s, 2),
+                'predict_rows_per_s': round(predict_rows / bulk_s),
+                'single_predict_ms': round(single_ms, 3),
+                'accuracy': round(accuracy_score(y_test, model.predict(X_test)), 4),
+            })
+    return pd.DataFrame(results)
+
+
+# Raw order-history columns read by the streaming trainer
+ORDER_COLUMNS = ['distance_km', 'weight_g', 'order_dow', 'order_month', 'freight_value',
+                 'item_count', 'seller_city', 'customer_city', 'is_late']
+
+
+def iter_order_chunks(paths, chunksize=250_000, columns=ORDER_COLUMNS):
+    """Yield DataFrames of at most `chunksize` rows from CSV / Parquet order files."""
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    for path in paths:
+        if str(path).endswith('.parquet'):
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize,
+                                                            columns=columns):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+
+
+def _reservoir_update(reservoir, rows, capacity):
+    """Bottom-k sampling: keep the `capacity` rows with the smallest `_key`."""
+    if reservoir is not None:
+        if len(reservoir) >= capacity:
+            rows = rows[rows['_key'].to_numpy() < reservoir['_key'].max()]
+        rows = pd.concat([reservoir, rows], ignore_index=True)
+    if len(rows) > capacity:
+        rows = rows.nsmallest(capacity, '_key')
+    return rows
+
+
+def train_model_streaming(paths, backend='hist', sample_size=1_000_000,
+                          chunksize=250_000, seed=42):
+    """
+    Train from order files larger than memory. One pass over the chunks keeps
+    a uniform reservoir sample per class plus the full-history city counts;
+    the final training set is `sample_size` rows drawn from the reservoirs in
+    the true late / on-time ratio. For the 'hist' backend, cities outside the
+    most frequent MAX_CITY_CATEGORIES are pooled into 'Unknown'. Peak memory is bounded by one
+    chunk plus 2 * `sample_size` sampled rows, independent of history size.
+    """
+    rng = np.random.default_rng(seed)
+    vocab = {}
+    city_counts = np.zeros(0, dtype=np.int64)
+    reservoirs = {0: None, 1: None}
+    seen = {0: 0, 1: 0}
+    for chunk in iter_order_chunks(paths, chunksize):
+        chunk = chunk[chunk['is_late'].notna()]
+        label = chunk['is_late'].to_numpy().astype(np.int8)
+        # Encode cities against a vocabulary that grows as new names appear
+        codes = {}
+        for col in ('seller_city', 'customer_city'):
+            names = chunk[col].fillna('Unknown').astype(str)
+            for name in names.unique():
+                vocab.setdefault(name, len(vocab))
+            codes[col] = names.map(vocab).to_numpy(np.int32)
+        counts = np.bincount(np.concatenate(list(codes.values())), minlength=len(vocab))
+        counts[:len(city_counts)] += city_counts
+        city_counts = counts
+
+        rows = chunk[ORDER_COLUMNS[:6]].assign(**codes, _key=rng.random(len(chunk)))
+        for cls in (0, 1):
+            mask = label == cls
+            seen[cls] += int(mask.sum())
+            reservoirs[cls] = _reservoir_update(reservoirs[cls], rows[mask], sample_size)
+
+    total = seen[0] + seen[1]
+    if not total:
+        raise ValueError("No labelled orders found in the given files")
+    print(f"📚 Streamed {total:,} orders ({seen[1] / total:.1%} late), "
+          f"{len(vocab):,} cities")
+
+    parts = []
+    for cls in (0, 1):
+        take = min(round(sample_size * seen[cls] / total), seen[cls])
+        if take:
+            parts.append(reservoirs[cls].nsmallest(take, '_key').assign(is_late=cls))
+    sample = pd.concat(parts, ignore_index=True).drop(columns='_key')
+
+    names = np.array(list(vocab), dtype=object)
+    if backend == 'hist' and len(names) > MAX_CITY_CATEGORIES:
+        rare = np.argsort(-city_counts, kind='stable')[MAX_CITY_CATEGORIES - 1:]
+        names[rare] = 'Unknown'
+    for col in ('seller_city', 'customer_city'):
+        sample[col] = names[sample[col].to_numpy()]
+    return train_model(sample, backend=backend)
+
+
+class FlatForest:
+    """
+    A fitted binary GradientBoostingClassifier flattened into contiguous node
+    arrays (feature, threshold, left, right, value) over all trees. Leaves
+    point to themselves, so every tree is walked in lock-step for a fixed
+    number of vectorized steps instead of calling into sklearn per tree.
+    Values are pre-scaled by the learning rate; `base` is the initial log-odds.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, base, depth):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.base = float(base)
+        self.depth = int(depth)
+
+    @classmethod
+    def from_model(cls, model):
+        if model.estimators_.shape[1] != 1:
+            raise ValueError("FlatForest supports binary classifiers only")
+        parts = {k: [] for k in ('feature', 'threshold', 'left', 'right', 'value')}
+        roots, offset, depth = [], 0, 0
+        for est in model.estimators_[:, 0]:
+            t = est.tree_
+            idx = np.arange(t.node_count) + offset
+            leaf = t.children_left < 0
+            parts['feature'].append(np.where(leaf, 0, t.feature))
+            parts['threshold'].append(np.where(leaf, np.inf, t.threshold))
+            parts['left'].append(np.where(leaf, idx, t.children_left + offset))
+            parts['right'].append(np.where(leaf, idx, t.children_right + offset))
+            parts['value'].append(model.learning_rate * t.value[:, 0, 0])
+            roots.append(offset)
+            offset += t.node_count
+            depth = max(depth, t.max_depth)
+        flat = cls(*(np.concatenate(parts[k]) for k in parts), roots, 0.0, depth)
+        # Initial log-odds, taken from the model's own decision function
+        x0 = np.zeros((1, model.n_features_in_))
+        names = getattr(model, 'feature_names_in_', None)
+        probe = x0 if names is None else pd.DataFrame(x0, columns=names)
+        flat.base = float(model.decision_function(probe)[0]) - flat.decision_function(x0)[0]
+        return flat
+
+    def save(self, path):
+        np.savez(path, feature=self.feature, threshold=self.threshold, left=self.left,
+                 right=self.right, value=self.value, roots=self.roots,
+                 base=self.base, depth=self.depth)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data['feature'], data['threshold'], data['left'], data['right'],
+                   data['value'], data['roots'], data['base'], data['depth'])
+
+    def decision_function(self, X):
+        """Log-odds for an (m, n_features) array, m >= 1."""
+        # sklearn trees compare float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        X = X.reshape(-1, X.shape[-1])
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.base + self.value[node].sum(axis=1)
+
+    def predict_one(self, x):
+        """Delay probability for one feature vector (in `features` order)."""
+        x = np.asarray(x, dtype=np.float32)
+        node = self.roots
+        for _ in range(self.depth):
+            node = np.where(x[self.feature[node]] <= self.threshold[node],
+                            self.left[node], self.right[node])
+        return 1.0 / (1.0 + np.exp(-(self.base + self.value[node].sum())))
+
+    def predict_proba(self, X):
+        """(m, 2) class probabilities, like the sklearn model."""
+        p = 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+        return np.column_stack([1 - p, p])
+
+
+# Delay probability cut-offs between the low / medium / high tiers
+RISK_THRESHOLDS = (0.35, 0.6)
+RISK_TIERS = ("🟢 LOW RISK - On Time", "🟡 MEDIUM RISK - Might Delay",
+              "🔴 HIGH RISK - Likely Delayed")
+
+DelayArtifacts = namedtuple('DelayArtifacts', 'model encoder features city_codes flat')
+
+
+class ModelRegistry:
+    """
+    Loads the delay model artifacts once per process and serves them from
+    memory. At most every `check_interval` seconds ARTIFACTS_FILE is stat'ed;
+    if it changed, the new bundle is loaded and swapped in with one assignment,
+    so callers always see a consistent model / encoder / feature set. Falls
+    back to the older three-file layout, and trains a model if neither exists.
+    """
+
+    LEGACY_FILES = ('delay_model.pkl', 'city_encoder.pkl', 'features.pkl')
+
+    def __init__(self, directory='.', check_interval=1.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._bundle = None
+        self._stamp = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _paths(self):
+        bundle = os.path.join(self.directory, ARTIFACTS_FILE)
+        if os.path.exists(bundle):
+            return [bundle]
+        return [os.path.join(self.directory, f) for f in self.LEGACY_FILES]
+
+    def _file_stamp(self):
+        try:
+            return tuple((p, st.st_mtime_ns, st.st_size)
+                         for p, st in ((p, os.stat(p)) for p in self._paths()))
+        except FileNotFoundError:
+            return None
+
+    def get(self):
+        """Current DelayArtifacts, reloading first if the files changed."""
+        if self._bundle is None:
+            self.reload()
+            return self._bundle
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            self._checked = now
+            if self._file_stamp() != self._stamp:
+                self.reload()
+        return self._bundle
+
+    def reload(self):
+        with self._lock:
+            stamp = self._file_stamp()
+            if stamp is None:
+                train_model(directory=self.directory)
+                stamp = self._file_stamp()
+            if stamp == self._stamp and self._bundle is not None:
+                return
+            paths = [p for p, _, _ in stamp]
+            if len(paths) == 1:
+                saved = joblib.load(paths[0])
+                model, encoder, features = saved['model'], saved['encoder'], saved['features']
+            else:
+                model, encoder, features = (joblib.load(p) for p in paths)
+            if len(paths) > 1 and self._file_stamp() != stamp and self._bundle is not None:
+                # Files changed mid-load; keep the old bundle and retry next check
+                return
+            codes = {city: i for i, city in enumerate(encoder.classes_)}
+            flat = FlatForest.from_model(model) \
+                if isinstance(model, GradientBoostingClassifier) else None
+            self._bundle = DelayArtifacts(model, encoder, features, codes, flat)
+            self._stamp = stamp
+            self.loads += 1
+
+
+MODELS = ModelRegistry()
+
+
 def predict_delay(distance_km, weight_g, order_dow, order_month,
                   freight_value, item_count, seller_city, customer_city):
     """Predict if a single delivery will be delayed."""
-    if not os.path.exists('delay_model.pkl'):
-        train_model()
+    model, _, features, codes, flat = MODELS.get()
+    other = codes.get('Unknown', 0)
+    seller_enc = codes.get(seller_city, other)
+    customer_enc = codes.get(customer_city, other)
 
-    model = joblib.load('delay_model.pkl')
-    le = joblib.load('city_encoder.pkl')
-    features = joblib.load('features.pkl')
+    row = [distance_km, weight_g, order_dow, order_month,
+           freight_value, item_count, seller_enc, customer_enc]
+    if flat is not None:
+        prob = float(flat.predict_one(row))
+    else:
+        prob = model.predict_proba(pd.DataFrame([row], columns=features))[0][1]
+    prediction = RISK_TIERS[int(np.digitize(prob, RISK_THRESHOLDS, right=True))]
+    return prediction, prob
 
-    known_cities = list(le.classes_)
-    seller_enc = le.transform([seller_city])[0] if seller_city in known_cities else 0
-    customer_enc = le.transform([customer_city])[0] if customer_city in known_cities else 0
 
-    input_data = pd.DataFrame([[distance_km, weight_g, order_dow, order_month,
-                                  freight_value, item_count, seller_enc, customer_enc]],
-                               columns=features)
+def _with_default(idx, default):
+    return np.where(idx < 0, default, idx)
 
-    prob = model.predict_proba(input_data)[0][1]
-    prediction = "🔴 HIGH RISK - Likely Delayed" if prob > 0.6 else \
-                 "🟡 MEDIUM RISK - Might Delay" if prob > 0.35 else \
-                 "🟢 LOW RISK - On Time"
-    return prediction, prob
+
+def predict_delay_batch(df, chunksize=100_000):
+    """
+    Score a shipment table (the generate_sample_data columns) with one
+    predict_proba call per `chunksize` rows. City columns are encoded per chunk
+    with a vectorized index lookup (unknown cities -> 'Unknown', else 0), so the feature matrix
+    never exceeds one chunk. Returns a frame aligned with `df` holding float32
+    `delay_prob` and a categorical `risk` tier. For files larger than memory,
+    call it on each chunk of pd.read_csv(..., chunksize=...).
+    """
+    model, encoder, features, _, _ = MODELS.get()
+    cities = pd.Index(encoder.classes_)
+    other = max(cities.get_indexer(['Unknown'])[0], 0)
+    n = len(df)
+    prob = np.empty(n, dtype=np.float32)
+    for lo in range(0, n, chunksize):
+        chunk = df.iloc[lo:lo + chunksize]
+        X = pd.DataFrame({
+            'seller_city_enc': _with_default(cities.get_indexer(chunk['seller_city']), other),
+            'customer_city_enc': _with_default(cities.get_indexer(chunk['customer_city']), other),
+        }, index=chunk.index)
+        for f in features:
+            if f not in X:
+                X[f] = chunk[f].fillna(0).to_numpy()
+        prob[lo:lo + chunksize] = model.predict_proba(X[features])[:, 1]
+    tier = np.digitize(prob, RISK_THRESHOLDS, right=True)
+    return pd.DataFrame({
+        'delay_prob': prob,
+        'risk': pd.Categorical.from_codes(tier, categories=RISK_TIERS),
+    }, index=df.index)
+
+
+def leg_delay_matrix(stops, km=None, weight_g=5000, order_dow=2, order_month=6,
+                     freight_value=100.0, item_count=1):
+    """
+    Delay probability for every directed leg between `stops` (n x n, zero
+    diagonal), treating stop i as seller_city and stop j as customer_city of
+    a shipment with the given attributes. All n^2 legs are scored in a single
+    predict_proba call. `km` defaults to the route optimizer's distance matrix.
+    """
+    model, _, features, codes, _ = MODELS.get()
+    stops = list(stops)
+    n = len(stops)
+    if km is None:
+        km = DistanceMatrix(stops).km
+    other = codes.get('Unknown', 0)
+    enc = np.array([codes.get(s, other) if isinstance(s, str) else other for s in stops])
+
+    columns = {
+        'distance_km': np.asarray(km, dtype=np.float64).ravel(),
+        'weight_g': np.full(n * n, weight_g),
+        'order_dow': np.full(n * n, order_dow),
+        'order_month': np.full(n * n, order_month),
+        'freight_value': np.full(n * n, freight_value),
+        'item_count': np.full(n * n, item_count),
+        'seller_city_enc': np.repeat(enc, n),
+        'customer_city_enc': np.tile(enc, n),
+    }
+    X = pd.DataFrame({f: columns[f] for f in features})
+    risk = model.predict_proba(X)[:, 1].reshape(n, n)
+    np.fill_diagonal(risk, 0.0)
+    return risk
 
 
 if __name__ == "__main__":
-    train_model()
+    if sys.argv[1:2] == ['benchmark']:
+        print("⏱️ Delay model backends")
+        print(benchmark_backends().to_string(index=False))
+    elif sys.argv[1:2] == ['stream']:
+        train_model_streaming(sys.argv[2:])
+    else:
+        train_model(backend=sys.argv[1] if len(sys.argv) > 1 else 'gbm')
@@ -0,0 +1,183 @@
+"""
+RouteIQ - Road Network Distances
+Loads a local road graph and serves many-to-many shortest-path distances (km)
+as a drop-in replacement for haversine in the route optimizer
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+
+from route_optimizer import haversine, haversine_matrix, unit_vectors
+
+
+class RoadGraph:
+    """
+    Road graph in CSR form (float32 edge lengths in km) with stop snapping.
+    Calling the graph with two (n, 2) lat/lon arrays returns the road-distance
+    matrix, so it plugs into route_optimizer.use_distance_provider(). Each stop
+    is snapped to its nearest graph node (the straight-line access leg is added)
+    and shortest paths come from compiled multi-source Dijkstra, one row per
+    distinct source node. Rows are kept in an LRU cache bounded by `cache_mb`.
+    Unreachable pairs come back as inf.
+    """
+
+    def __init__(self, lat, lon, indptr, indices, weights, cache_mb=64):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        n = len(self.lat)
+        self.graph = csr_matrix((np.asarray(weights, dtype=np.float32),
+                                 np.asarray(indices), np.asarray(indptr)), shape=(n, n))
+        self._tree = cKDTree(unit_vectors(np.column_stack([self.lat, self.lon])))
+        self._rows_cache = OrderedDict()
+        self.cache_mb = cache_mb
+        self._max_rows = max(1, int(cache_mb * 2**20 // (4 * max(n, 1))))
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_edges(cls, lat, lon, source, target, length_km=None, oneway=None, **kwargs):
+        """Build from node coordinates and an edge list of node positions."""
+        source = np.asarray(source, dtype=np.intp)
+        target = np.asarray(target, dtype=np.intp)
+        if length_km is None:
+            length_km = haversine((np.asarray(lat)[source], np.asarray(lon)[source]),
+                                  (np.asarray(lat)[target], np.asarray(lon)[target]))
+        length_km = np.asarray(length_km, dtype=np.float32)
+        if oneway is None:
+            both_ways = np.ones(len(source), dtype=bool)
+        else:
+            both_ways = ~np.asarray(oneway, dtype=bool)
+        rows = np.concatenate([source, target[both_ways]])
+        cols = np.concatenate([target, source[both_ways]])
+        vals = np.concatenate([length_km, length_km[both_ways]])
+        # Keep the shortest of any parallel edges
+        order = np.lexsort((vals, cols, rows))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (np.diff(rows[order]) != 0) | (np.diff(cols[order]) != 0)
+        csr = csr_matrix((vals[order][first], (rows[order][first], cols[order][first])),
+                         shape=(len(lat), len(lat)))
+        return cls(lat, lon, csr.indptr, csr.indices, csr.data, **kwargs)
+
+    @classmethod
+    def from_csv(cls, nodes_path, edges_path, **kwargs):
+        """
+        nodes.csv: node_id, lat, lon.
+        edges.csv: source, target[, length_km][, oneway] with node_id references.
+        """
+        nodes = pd.read_csv(nodes_path)
+        edges = pd.read_csv(edges_path)
+        ids = pd.Index(nodes['node_id'])
+        source, target = ids.get_indexer(edges['source']), ids.get_indexer(edges['target'])
+        if (source < 0).any() or (target < 0).any():
+            raise ValueError("edges reference node_ids missing from the nodes file")
+        return cls.from_edges(nodes['lat'].to_numpy(), nodes['lon'].to_numpy(), source, target,
+                              edges['length_km'].to_numpy() if 'length_km' in edges else None,
+                              edges['oneway'].to_numpy() if 'oneway' in edges else None,
+                              **kwargs)
+
+    def save(self, path):
+        """Write the compact binary form (.npz of node coords + CSR arrays)."""
+        np.savez(path, lat=self.lat, lon=self.lon, indptr=self.graph.indptr,
+                 indices=self.graph.indices, weights=self.graph.data)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        data = np.load(path)
+        return cls(data['lat'], data['lon'], data['indptr'], data['indices'], data['weights'],
+                   **kwargs)
+
+    def __getstate__(self):
+        # Send the graph itself to worker processes, not the KD-tree or cache
+        return {'lat': self.lat, 'lon': self.lon, 'indptr': self.graph.indptr,
+                'indices': self.graph.indices, 'weights': self.graph.data,
+                'cache_mb': self.cache_mb}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __len__(self):
+        return len(self.lat)
+
+    def snap(self, coords):
+        """Nearest graph node and straight-line access km for each (lat, lon)."""
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        chord, node = self._tree.query(unit_vectors(coords))
+        return node, 6371 * 2 * np.arcsin(np.minimum(chord / 2, 1.0))
+
+    def _rows(self, sources):
+        """
+        Yield (source, full distance row) for each distinct source node. Rows
+        are served from the LRU cache or computed in batches sized to keep the
+        Dijkstra output near 32 MB, then cached.
+        """
+        missing = []
+        for s in sources:
+            if s in self._rows_cache:
+                self._rows_cache.move_to_end(s)
+                yield s, self._rows_cache[s]
+            else:
+                missing.append(s)
+        self.hits += len(sources) - len(missing)
+        self.misses += len(missing)
+
+        batch_size = max(1, int(32 * 2**20 // (8 * max(len(self), 1))))
+        for lo in range(0, len(missing), batch_size):
+            batch = missing[lo:lo + batch_size]
+            for s, row in zip(batch, dijkstra(self.graph, indices=batch)):
+                row = row.astype(np.float32)
+                self._rows_cache[s] = row
+                if len(self._rows_cache) > self._max_rows:
+                    self._rows_cache.popitem(last=False)
+                yield s, row
+
+    @staticmethod
+    def _group(sources):
+        where = {}
+        for i, s in enumerate(np.asarray(sources, dtype=np.intp).tolist()):
+            where.setdefault(s, []).append(i)
+        return where
+
+    def node_distances(self, sources, targets):
+        """Shortest-path km between graph nodes, (len(sources), len(targets))."""
+        targets = np.asarray(targets, dtype=np.intp)
+        out = np.empty((len(sources), len(targets)))
+        where = self._group(sources)
+        for s, row in self._rows(list(where)):
+            out[where[s]] = row[targets]
+        return out
+
+    def node_pairs(self, sources, targets):
+        """Shortest-path km from sources[i] to targets[i], shape (len(sources),)."""
+        targets = np.asarray(targets, dtype=np.intp)
+        out = np.empty(len(targets))
+        where = self._group(sources)
+        for s, row in self._rows(list(where)):
+            out[where[s]] = row[targets[where[s]]]
+        return out
+
+    def pairs(self, coords_a, coords_b):
+        """
+        Road km between matching rows of two (k, 2) lat/lon arrays, e.g. the
+        legs of a path, without building the k x k matrix that __call__ would.
+        """
+        coords_a = np.asarray(coords_a, dtype=np.float64).reshape(-1, 2)
+        coords_b = np.asarray(coords_b, dtype=np.float64).reshape(-1, 2)
+        node_a, access_a = self.snap(coords_a)
+        node_b, access_b = self.snap(coords_b)
+        km = self.node_pairs(node_a, node_b) + access_a + access_b
+        km[haversine(coords_a.T, coords_b.T) == 0] = 0.0
+        return km
+
+    def __call__(self, coords_a, coords_b):
+        node_a, access_a = self.snap(coords_a)
+        node_b, access_b = self.snap(coords_b)
+        km = self.node_distances(node_a, node_b)
+        km += access_a[:, None] + access_b[None, :]
+        # A stop is 0 km from itself even though its access leg is not
+        km[haversine_matrix(coords_a, coords_b) == 0] = 0.0
+        return km
@@ -0,0 +1,143 @@
+"""
+RouteIQ - Stop Registry
+Struct-of-arrays store of stop coordinates (float64 lat/lon) with a name -> index map
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+
+# Sample Indian hub coordinates
+HUB_COORDS = {
+    'Chennai':     (13.0827, 80.2707),
+    'Mumbai':      (19.0760, 72.8777),
+    'Delhi':       (28.6139, 77.2090),
+    'Bangalore':   (12.9716, 77.5946),
+    'Hyderabad':   (17.3850, 78.4867),
+    'Kolkata':     (22.5726, 88.3639),
+    'Pune':        (18.5204, 73.8567),
+    'Ahmedabad':   (23.0225, 72.5714),
+    'Coimbatore':  (11.0168, 76.9558),
+    'Madurai':     (9.9252,  78.1198),
+    'Jaipur':      (26.9124, 75.7873),
+    'Surat':       (21.1702, 72.8311),
+    'Lucknow':     (26.8467, 80.9462),
+    'Nagpur':      (21.1458, 79.0882),
+    'Visakhapatnam': (17.6868, 83.2185),
+}
+
+
+class StopRegistry:
+    """
+    Stop catalog held as parallel float64 `lat` / `lon` arrays plus a name -> index
+    dict. Callers resolve names to integer indices once and index the arrays from
+    then on; unknown names raise KeyError instead of silently becoming (0, 0).
+    """
+
+    def __init__(self, names, lat, lon, path=None):
+        self.names = [str(n) for n in names]
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        if not len(self.names) == len(self.lat) == len(self.lon):
+            raise ValueError("names, lat and lon must have the same length")
+        self.index = {name: i for i, name in enumerate(self.names)}
+        if len(self.index) != len(self.names):
+            raise ValueError("Stop names must be unique")
+        self.path = path
+
+    @classmethod
+    def from_dict(cls, coords):
+        """Build from a {name: (lat, lon)} mapping such as HUB_COORDS."""
+        latlon = np.array(list(coords.values()), dtype=np.float64).reshape(-1, 2)
+        return cls(list(coords), latlon[:, 0], latlon[:, 1])
+
+    @classmethod
+    def from_frame(cls, df, name_col='name', lat_col='lat', lon_col='lon'):
+        return cls(df[name_col].astype(str).tolist(),
+                   df[lat_col].to_numpy(np.float64), df[lon_col].to_numpy(np.float64))
+
+    @classmethod
+    def from_csv(cls, path, name_col='name', lat_col='lat', lon_col='lon'):
+        df = pd.read_csv(path, usecols=[name_col, lat_col, lon_col])
+        return cls.from_frame(df, name_col, lat_col, lon_col)
+
+    @classmethod
+    def from_parquet(cls, path, name_col='name', lat_col='lat', lon_col='lon'):
+        df = pd.read_parquet(path, columns=[name_col, lat_col, lon_col])
+        return cls.from_frame(df, name_col, lat_col, lon_col)
+
+    def save(self, directory):
+        """Write lat.npy / lon.npy / names.npy so the catalog can be memory-mapped later."""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'lat.npy'), self.lat)
+        np.save(os.path.join(directory, 'lon.npy'), self.lon)
+        np.save(os.path.join(directory, 'names.npy'), np.array(self.names, dtype=str))
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Load a saved catalog; with mmap=True the coordinate arrays stay on disk."""
+        mode = 'r' if mmap else None
+        lat = np.load(os.path.join(directory, 'lat.npy'), mmap_mode=mode)
+        lon = np.load(os.path.join(directory, 'lon.npy'), mmap_mode=mode)
+        names = np.load(os.path.join(directory, 'names.npy'), mmap_mode=mode)
+        return cls(names, lat, lon, path=directory if mmap else None)
+
+    def __getstate__(self):
+        # Memory-mapped catalogs travel to worker processes as their path only
+        if self.path is not None:
+            return {'path': self.path}
+        return {'names': self.names, 'lat': np.asarray(self.lat), 'lon': np.asarray(self.lon)}
+
+    def __setstate__(self, state):
+        if 'path' in state:
+            other = StopRegistry.load(state['path'], mmap=True)
+        else:
+            other = StopRegistry(state['names'], state['lat'], state['lon'])
+        self.__dict__.update(other.__dict__)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def index_of(self, name):
+        try:
+            return self.index[name]
+        except KeyError:
+            raise KeyError(f"Unknown stop: {name!r}") from None
+
+    def indices(self, names):
+        """Resolve many names to an int array of registry indices."""
+        return np.fromiter((self.index_of(n) for n in names), dtype=np.intp, count=len(names))
+
+    def coords(self, idx):
+        """(k, 2) lat/lon array for registry indices."""
+        idx = np.asarray(idx, dtype=np.intp)
+        return np.column_stack([self.lat[idx], self.lon[idx]])
+
+    def coord(self, i):
+        """(lat, lon) of one registry index."""
+        return float(self.lat[i]), float(self.lon[i])
+
+    def register(self, names, lat, lon):
+        """Append new stops and return their indices; existing names are rejected."""
+        names = [str(n) for n in names]
+        clash = [n for n in names if n in self.index]
+        if clash:
+            raise ValueError(f"Stops already registered: {clash}")
+        first = len(self.names)
+        self.lat = np.append(self.lat, np.asarray(lat, dtype=np.float64))
+        self.lon = np.append(self.lon, np.asarray(lon, dtype=np.float64))
+        for offset, name in enumerate(names):
+            self.index[name] = first + offset
+        self.names.extend(names)
+        self.path = None
+        return np.arange(first, len(self.names))
+
+    def to_dict(self):
+        return {name: self.coord(i) for i, name in enumerate(self.names)}
+
+
+HUBS = StopRegistry.from_dict(HUB_COORDS)
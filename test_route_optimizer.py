@@ -0,0 +1,170 @@
+"""
+RouteIQ - Route optimizer regression checks (run with pytest)
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+from scipy.optimize import linear_sum_assignment
+
+from road_network import RoadGraph
+from route_optimizer import (BOUND_KEYS, RouteCache, TravelTimeTensor, _nearest_neighbor_order,
+                             _pd_best_insertion, assign_to_depots, optimize_and_compare,
+                             optimize_cached, solve_time_dependent, solve_time_windows,
+                             use_distance_provider)
+
+
+def _insertion_cost(seq, ext, p, d, i, j):
+    a, b = seq[:-1], seq[1:]
+    if i == j:
+        return ext[a[i], p] + ext[p, d] + ext[d, b[i]] - ext[a[i], b[i]]
+    return (ext[a[i], p] + ext[p, b[i]] - ext[a[i], b[i]]
+            + ext[a[j], d] + ext[d, b[j]] - ext[a[j], b[j]])
+
+
+def _brute_force_insertion(seq, ext, load, p, d, q, capacity):
+    ok = load + q <= capacity + 1e-9
+    best = np.inf
+    for i in range(len(seq) - 1):
+        for j in range(i, len(seq) - 1):
+            if ok[i:j + 1].all():
+                best = min(best, _insertion_cost(seq, ext, p, d, i, j))
+    return best
+
+
+def _euclidean(xy):
+    return np.hypot(*(xy[:, None] - xy[None]).transpose(2, 0, 1))
+
+
+def test_pd_insertion_over_capacity_slot_on_long_chain():
+    # 40-stop chain of 10 km legs with one over-capacity slot; pickup costs
+    # vary far more than any single leg length
+    n = 40
+    xy = np.zeros((n + 2, 2))
+    xy[:n, 0] = np.arange(n) * 10
+    xy[n] = (5, 60)
+    xy[n + 1] = (385, 3)
+    ext = _euclidean(xy)
+    seq = np.arange(n)
+    load = np.zeros(n - 1)
+    load[20] = 5
+    cost, i, j = _pd_best_insertion(seq, ext, load, n, n + 1, 1.0, 5.0)
+    expected = _brute_force_insertion(seq, ext, load, n, n + 1, 1.0, 5.0)
+    assert np.isclose(cost, expected)
+    assert np.isclose(_insertion_cost(seq, ext, n, n + 1, i, j), expected)
+
+
+def test_pd_insertion_matches_brute_force():
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        m = int(rng.integers(3, 15))
+        ext = _euclidean(rng.random((m + 2, 2)) * rng.choice([1, 100, 1000]))
+        seq = np.arange(m)
+        load = rng.integers(0, 4, m - 1).astype(float)
+        cost, i, j = _pd_best_insertion(seq, ext, load, m, m + 1, 1.0, 3.0)
+        expected = _brute_force_insertion(seq, ext, load, m, m + 1, 1.0, 3.0)
+        assert np.isclose(cost, expected) or cost == expected == np.inf
+        if np.isfinite(expected):
+            assert np.isclose(_insertion_cost(seq, ext, m, m + 1, i, j), expected)
+
+
+def _assigned_cost(cost, depot):
+    used = depot >= 0
+    return cost[used, depot[used]].sum()
+
+
+def test_depot_assignment_matches_linear_sum_assignment():
+    rng = np.random.default_rng(0)
+    for t in range(300):
+        n, k = int(rng.integers(1, 60)), int(rng.integers(1, 6))
+        cost = rng.random((n, k)) * 100
+        capacities = rng.integers(0, n + 2, k).astype(float)
+        if t % 5 == 0:
+            capacities[0] = np.inf
+        depot = assign_to_depots(cost, None, capacities)
+        # Reference: depot columns repeated once per capacity slot
+        columns = np.repeat(np.arange(k), np.minimum(capacities, n).astype(np.intp))
+        rows, cols = linear_sum_assignment(cost[:, columns])
+        assert (depot >= 0).sum() == len(rows)
+        assert np.isclose(_assigned_cost(cost, depot), cost[rows, columns[cols]].sum())
+        assert all((depot == d).sum() <= c for d, c in enumerate(capacities))
+
+
+def _brute_force_assignment(cost, capacities):
+    """Most stops assigned, then least cost, over every reachable assignment."""
+    n, k = cost.shape
+    best = (-1, np.inf)
+    for depot in itertools.product(range(-1, k), repeat=n):
+        depot = np.array(depot)
+        used = depot >= 0
+        if not np.isfinite(cost[used, depot[used]]).all():
+            continue
+        if any((depot == d).sum() > c for d, c in enumerate(capacities)):
+            continue
+        key = (int(used.sum()), _assigned_cost(cost, depot))
+        if key[0] > best[0] or (key[0] == best[0] and key[1] < best[1] - 1e-9):
+            best = key
+    return best
+
+
+def test_depot_assignment_with_unreachable_pairs():
+    inf = np.inf
+    depot = assign_to_depots([[1, inf], [2, 3], [inf, 1], [5, 6]], None, [1, 1])
+    assert list(depot) == [0, -1, 1, -1]
+    assert list(assign_to_depots([[inf, inf], [2, 3]], None, [5, 5])) == [-1, 0]
+    assert list(assign_to_depots([[inf, inf], [inf, 3]], None, None)) == [-1, 1]
+
+    rng = np.random.default_rng(1)
+    for _ in range(200):
+        n, k = int(rng.integers(1, 6)), int(rng.integers(1, 4))
+        cost = rng.random((n, k)) * 10
+        cost[rng.random((n, k)) < 0.3] = inf
+        capacities = rng.integers(0, 3, k).astype(float)
+        depot = assign_to_depots(cost, None, capacities)
+        used = depot >= 0
+        assert np.isfinite(cost[used, depot[used]]).all()
+        assert all((depot == d).sum() <= c for d, c in enumerate(capacities))
+        count, total = _brute_force_assignment(cost, capacities)
+        assert used.sum() == count
+        assert np.isclose(_assigned_cost(cost, depot), total)
+
+
+def test_disconnected_road_graph():
+    # Two separate two-node roads; stops sit on the nodes
+    lat, lon = [19.0, 19.1, 28.6, 28.7], [72.8, 72.9, 77.2, 77.3]
+    graph = RoadGraph.from_edges(lat, lon, [0, 2], [1, 3])
+    stops = list(zip(lat, lon))
+    order, total = _nearest_neighbor_order(graph(np.array(stops), np.array(stops)))
+    assert sorted(order) == [0, 1, 2, 3]
+    assert total == np.inf
+    use_distance_provider(graph)
+    try:
+        with pytest.raises(ValueError, match="No route"):
+            optimize_and_compare(stops, improve="2opt")
+    finally:
+        use_distance_provider(None)
+
+
+def test_time_dependent_empty_and_single_stop():
+    tensor = TravelTimeTensor(['Chennai'], np.ones((24, 1, 1)))
+    assert solve_time_dependent([], tensor)['route'] == []
+    result = solve_time_dependent(['Chennai'], tensor, depart_hour=9.0)
+    assert result['route'] == ['Chennai'] and result['finish_h'] == 9.0
+
+
+def test_cached_route_keeps_lower_bound(tmp_path):
+    cities = ['Chennai', 'Madurai', 'Coimbatore', 'Bangalore', 'Hyderabad', 'Pune']
+    miss = optimize_cached(cities, 'Chennai', RouteCache(directory=str(tmp_path)),
+                           improve="2opt", bound=True)
+    hit = optimize_cached(cities[::-1], 'Chennai', RouteCache(directory=str(tmp_path)),
+                          improve="2opt", bound=True)
+    for key in BOUND_KEYS:
+        assert type(miss[key]) is float
+        assert hit[key] == miss[key]
+
+
+def test_time_windows_empty_and_single_stop():
+    assert solve_time_windows([], [])['route'] == []
+    result = solve_time_windows(['Chennai'], [(9.0, 12.0)])
+    assert result['route'] == ['Chennai'] and result['infeasible'] == []